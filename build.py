@@ -11,16 +11,29 @@ import logging
 import stat
 from pathlib import Path
 
+import ls_cache
+import prewarm
+from io_governor import IOGovernor
+
 # Configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("SerenaBuilder")
 
+# Shared adaptive concurrency for all copy/extract stages
+io_gov = IOGovernor()
+
 # Paths
 BUILDER_ROOT = Path(__file__).parent
 PROJECT_ROOT = Path(r"D:\\Repos\\serena") # Hardcoded to original repo
 DIST_DIR = BUILDER_ROOT / "dist" / "serena-standalone"
 PYTHON_VERSION = "3.11"
 
+# Start each bundled language server once at build time and ship its warm state (slow)
+PREWARM_LANGUAGE_SERVERS = False
+
+# Generate serena.bat with the resident warm launcher (see serena_warm.py)
+WARM_LAUNCHER = False
+
 def remove_readonly(func, path, _):
     """Clear the readonly bit and reattempt the removal"""
     os.chmod(path, stat.S_IWRITE)
@@ -78,8 +91,6 @@ def get_node_path():
 def download_node(target_dir):
     """Download Node.js binary if not found locally."""
     import urllib.request
-    import zipfile
-    import io
     
     NODE_VERSION = "v20.10.0"
     NODE_URL = f"https://nodejs.org/dist/{NODE_VERSION}/node-{NODE_VERSION}-win-x64.zip"
@@ -87,29 +98,29 @@ def download_node(target_dir):
     logger.info(f"Downloading Node.js {NODE_VERSION} from {NODE_URL}...")
     try:
         with urllib.request.urlopen(NODE_URL) as response:
-            with zipfile.ZipFile(io.BytesIO(response.read())) as z:
-                # The zip contains a folder "node-v...". We want the contents of that folder.
-                # Or specifically just node.exe for minimal size? 
-                # npm is also needed for some LS that download packages via npm!
-                # So we should extract the whole thing.
-                
-                # Extract to a temp dir first
-                temp_extract = target_dir.parent / "node_temp"
-                z.extractall(temp_extract)
-                
-                # Move contents
-                extracted_folder = temp_extract / f"node-{NODE_VERSION}-win-x64"
-                
-                # Copy node.exe
-                shutil.copy2(extracted_folder / "node.exe", target_dir / "node.exe")
-                
-                # Copy others if we want full npm support (optional but recommended)
-                # For now, let's just stick to node.exe to keep it simple as per request
-                # Most LS are single JS files run with 'node server.js'
-                
-                shutil.rmtree(temp_extract)
-                logger.info("Node.js downloaded and extracted.")
-                return target_dir / "node.exe"
+            archive = response.read()
+        # The zip contains a folder "node-v...". We want the contents of that folder.
+        # Or specifically just node.exe for minimal size? 
+        # npm is also needed for some LS that download packages via npm!
+        # So we should extract the whole thing.
+        
+        # Extract to a temp dir first
+        temp_extract = target_dir.parent / "node_temp"
+        io_gov.extract_zip(archive, temp_extract, label="extract Node.js")
+        
+        # Move contents
+        extracted_folder = temp_extract / f"node-{NODE_VERSION}-win-x64"
+        
+        # Copy node.exe
+        shutil.copy2(extracted_folder / "node.exe", target_dir / "node.exe")
+        
+        # Copy others if we want full npm support (optional but recommended)
+        # For now, let's just stick to node.exe to keep it simple as per request
+        # Most LS are single JS files run with 'node server.js'
+        
+        shutil.rmtree(temp_extract)
+        logger.info("Node.js downloaded and extracted.")
+        return target_dir / "node.exe"
     except Exception as e:
         logger.error(f"Failed to download Node.js: {e}")
         return None
@@ -139,7 +150,7 @@ def build_standalone():
     # 1. Copy Python
     python_src = find_uv_python_path()
     logger.info(f"Copying Python from {python_src}...")
-    shutil.copytree(python_src, python_dest_dir)
+    io_gov.copytree(python_src, python_dest_dir, label="copy Python")
     
     # 2. Copy Node.js
     node_src = get_node_path()
@@ -172,7 +183,7 @@ def build_standalone():
         if item.is_dir() and not item.name.startswith(".") and not item.name.startswith("__"):
             dest = lib_dir / item.name
             if dest.exists(): shutil.rmtree(dest)
-            shutil.copytree(item, dest)
+            io_gov.copytree(item, dest, label=f"copy {item.name} source")
             
     # Copy Launcher from resources
     launcher_src = BUILDER_ROOT / "resources" / "launcher.py"
@@ -182,6 +193,10 @@ def build_standalone():
     else:
         logger.warning(f"Launcher not found at {launcher_src}")
 
+    if WARM_LAUNCHER:
+        logger.info("Injecting warm launcher...")
+        shutil.copy2(BUILDER_ROOT / "serena_warm.py", lib_dir / "serena_warm.py")
+
     # Create __main__.py for serena package to be executable
     (lib_dir / "serena" / "__main__.py").write_text(
         "from serena.cli import top_level\nif __name__ == '__main__':\n    top_level()\n",
@@ -202,26 +217,53 @@ def build_standalone():
         # Only copy language_servers directory to save space/time if other junk exists
         ls_src = home_solidlsp / "language_servers"
         if ls_src.exists():
-            shutil.copytree(ls_src, dest_solidlsp / "language_servers")
+            io_gov.copytree(ls_src, dest_solidlsp / "language_servers",
+                            ignore=shutil.ignore_patterns(ls_cache.USAGE_FILE_NAME), label="copy language servers")
+            # Track usage and keep the cache within its size budget. The whole cache was
+            # packed, so only pinned languages are protected from eviction
+            packed = [p.name for p in ls_src.iterdir() if p.is_dir()]
+            ls_cache.record_usage(ls_src, packed, ls_cache.EVENT_PACK)
+            evicted = ls_cache.enforce_budget(ls_src)
+            if evicted:
+                logger.info(f"Evicted from LS cache: {', '.join(evicted)}")
         else:
             logger.warning("No language_servers found in .solidlsp!")
     else:
         logger.warning("~/.solidlsp does not exist. Language servers will be missing!")
 
-    # 6. Create Launch Scripts
+    # 6. Optionally pre-warm the staged Language Servers
+    staged_ls = dest_solidlsp / "language_servers"
+    if PREWARM_LANGUAGE_SERVERS and staged_ls.exists():
+        logger.info("Pre-warming language servers...")
+        prewarm.prewarm_language_servers(DIST_DIR, [p.name for p in staged_ls.iterdir() if p.is_dir()], io_gov)
+
+    # 7. Create Launch Scripts
     logger.info("Creating launcher scripts...")
-    create_launchers(DIST_DIR)
+    create_launchers(DIST_DIR, warm=WARM_LAUNCHER)
     
     logger.info("="*60)
     logger.info(f"Build Complete: {DIST_DIR}")
     logger.info("="*60)
 
-def create_launchers(dist_path):
+def create_launchers(dist_path, warm=False):
     # serena.bat
     # We need to set PYTHONPATH to lib and pywin32 subdirs
     # We need to add bin, python and pywin32_system32 to PATH
     # We need to set SOLIDLSP_DIR to data/solidlsp
     
+    run_serena = r""""%PYTHON_HOME%\python.exe" -m serena %*
+"""
+    if warm:
+        run_serena = r"""REM Warm launcher: the client hands the call to the resident process, or runs it cold
+REM itself when it cannot be served warm (SERENA_NO_WARM=1 disables)
+if defined SERENA_NO_WARM goto serena_cold
+"%PYTHON_HOME%\python.exe" -I -S "%LIB_DIR%\serena_warm.py" client %*
+goto serena_done
+:serena_cold
+"%PYTHON_HOME%\python.exe" -m serena %*
+:serena_done
+"""
+
     bat_content = r"""@echo off
 setlocal enabledelayedexpansion
 
@@ -246,8 +288,7 @@ REM Set PYTHONPATH to include our lib directory and pywin32 libraries
 set "PYTHONPATH=%LIB_DIR%;%WIN32_LIB%;%WIN32_LIB_LIB%;%PYTHONWIN%;%PYTHONPATH%"
 
 REM Run Serena
-"%PYTHON_HOME%\python.exe" -m serena %*
-
+""" + run_serena + r"""
 if %ERRORLEVEL% NEQ 0 (
     echo Serena exited with error code %ERRORLEVEL%
     pause
@@ -295,7 +336,7 @@ endlocal
     (dist_path / "serena-launcher.bat").write_text(gui_bat_content, encoding="utf-8")
 
     # README
-    readme_content = "# Serena Standalone
+    readme_content = """# Serena Standalone
 
 This is a fully portable version of Serena.
 
@@ -323,7 +364,7 @@ serena.bat start-mcp-server
 - `python/`: Embedded Python environment
 - `lib/`: Python libraries and Serena source
 - `data/`: Data files (Language Servers)
-"
+"""
     (dist_path / "README.txt").write_text(readme_content, encoding="utf-8")
 
 if __name__ == "__main__":
@@ -10,6 +10,10 @@ from pathlib import Path
 import stat
 import logging
 
+import ls_cache
+import prewarm
+from io_governor import IOGovernor
+
 # Configure logging for the GUI console
 class TextHandler(logging.Handler):
     def __init__(self, text_widget):
@@ -53,6 +57,12 @@ class SerenaBuilderGUI(tk.Tk):
         self.ls_source_dir = tk.StringVar(value=self.detect_ls_dir())
         self.python_path = tk.StringVar(value="") 
         self.selected_languages = {} # name -> BooleanVar
+        self.cache_budget_gb = tk.StringVar(
+            value=f"{ls_cache.get_budget(self.ls_source_dir.get()) / 1024 ** 3:g}")
+        self.cache_status = tk.StringVar(value="")
+        self.prewarm_ls = tk.BooleanVar(value=False)
+        self.warm_launcher = tk.BooleanVar(value=False)
+        self.io_gov = IOGovernor()  # shared by all copy stages, keeps what it learnt between builds
         
         # Layout
         main_frame = ttk.Frame(self, padding="10")
@@ -81,6 +91,16 @@ class SerenaBuilderGUI(tk.Tk):
         ttk.Separator(ls_toolbar, orient=tk.VERTICAL).pack(side=tk.LEFT, fill=tk.Y, padx=10)
         ttk.Label(ls_toolbar, text="Download Tools:").pack(side=tk.LEFT)
         ttk.Button(ls_toolbar, text="Download Selected", command=self.download_selected_ls).pack(side=tk.LEFT, padx=5)
+
+        # Cache management
+        cache_toolbar = ttk.Frame(ls_frame)
+        cache_toolbar.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(cache_toolbar, textvariable=self.cache_status).pack(side=tk.LEFT)
+        ttk.Button(cache_toolbar, text="Enforce Budget", command=self.enforce_cache_budget).pack(side=tk.RIGHT, padx=5)
+        ttk.Entry(cache_toolbar, textvariable=self.cache_budget_gb, width=6).pack(side=tk.RIGHT)
+        ttk.Label(cache_toolbar, text="Budget (GB):").pack(side=tk.RIGHT)
+        ttk.Button(cache_toolbar, text="Unpin Selected", command=lambda: self.pin_selected_ls(False)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(cache_toolbar, text="Pin Selected", command=lambda: self.pin_selected_ls(True)).pack(side=tk.RIGHT, padx=5)
         
         # List area
         self.ls_canvas = tk.Canvas(ls_frame)
@@ -106,12 +126,20 @@ class SerenaBuilderGUI(tk.Tk):
         self.logger = logging.getLogger("GuiBuilder")
         self.logger.setLevel(logging.INFO)
         self.logger.addHandler(TextHandler(self.log_text))
+        # Shared builder modules (ls_cache, prewarm, io_governor) log below "SerenaBuilder"
+        module_logger = logging.getLogger("SerenaBuilder")
+        module_logger.setLevel(logging.INFO)
+        module_logger.addHandler(TextHandler(self.log_text))
         
         # 4. Actions
         action_frame = ttk.Frame(main_frame)
         action_frame.pack(fill=tk.X)
         
         ttk.Button(action_frame, text="BUILD STANDALONE PACKAGE", command=self.start_build_thread).pack(side=tk.RIGHT, padx=5)
+        ttk.Checkbutton(action_frame, text="Pre-warm language servers (slower build, faster first start)",
+                        variable=self.prewarm_ls).pack(side=tk.RIGHT, padx=5)
+        ttk.Checkbutton(action_frame, text="Warm CLI launcher",
+                        variable=self.warm_launcher).pack(side=tk.RIGHT, padx=5)
 
         # Initial populate
         self.refresh_ls_list()
@@ -139,19 +167,29 @@ class SerenaBuilderGUI(tk.Tk):
         return str(Path.home() / ".solidlsp" / "language_servers") # Default
 
     def refresh_ls_list(self):
+        # Scanning the cache may walk server trees: do it off the Tk thread
+        source_dir = Path(self.ls_source_dir.get())
+
+        def scan():
+            entries = {e["name"]: e for e in ls_cache.cache_entries(source_dir)}
+            budget = ls_cache.get_budget(source_dir)
+            self.after(0, lambda: self.populate_ls_list(entries, budget))
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def populate_ls_list(self, entries, budget):
         # Clear existing
         for widget in self.ls_list_frame.winfo_children():
             widget.destroy()
         self.selected_languages.clear()
-        
-        source_dir = Path(self.ls_source_dir.get())
-        
-        # Get cached directories
-        cached = set()
-        if source_dir.exists():
-            for item in source_dir.iterdir():
-                if item.is_dir():
-                    cached.add(item.name)
+
+        # Cached directories (with recorded size and pin state)
+        cached = set(entries)
+        used = sum(e["size"] for e in entries.values())
+        self.cache_status.set(
+            f"Cache: {ls_cache.format_size(used)} / {ls_cache.format_size(budget)} "
+            f"({used * 100 // budget if budget else 0}%)"
+        )
         
         # Merge with known languages to show everything
         all_langs = sorted(list(set(KNOWN_LANGUAGES) | cached))
@@ -163,7 +201,10 @@ class SerenaBuilderGUI(tk.Tk):
             self.selected_languages[lang] = var
             
             # Label text: Name + [Cached] status
-            status = " (Cached)" if lang in cached else ""
+            status = ""
+            if lang in cached:
+                entry = entries[lang]
+                status = f" (Cached, {ls_cache.format_size(entry['size'])}{', pinned' if entry['pinned'] else ''})"
             
             cb = ttk.Checkbutton(self.ls_list_frame, text=f"{lang}{status}", variable=var)
             cb.grid(row=r, column=c, sticky="w", padx=10, pady=2)
@@ -198,12 +239,42 @@ class SerenaBuilderGUI(tk.Tk):
             
         cmd = ["uv", "run", "python", str(script_path), "--languages", ",".join(selected)]
         
-        threading.Thread(target=self.run_subprocess, args=(cmd, "Download Complete"), daemon=True).start()
+        def on_success():
+            ls_source = self.ls_source_dir.get()
+            ls_cache.record_usage(ls_source, selected, ls_cache.EVENT_DOWNLOAD)
+            ls_cache.enforce_budget(ls_source, keep=selected)
+
+        threading.Thread(target=self.run_subprocess, args=(cmd, "Download Complete", on_success), daemon=True).start()
+
+    def pin_selected_ls(self, pinned):
+        selected = [l for l, v in self.selected_languages.items() if v.get()]
+        if not selected:
+            messagebox.showwarning("Warning", "No languages selected.")
+            return
+        ls_cache.set_pinned(self.ls_source_dir.get(), selected, pinned)
+        self.logger.info(f"{'Pinned' if pinned else 'Unpinned'}: {', '.join(selected)}")
+        self.refresh_ls_list()
+
+    def enforce_cache_budget(self):
+        try:
+            budget = ls_cache.parse_budget_gb(self.cache_budget_gb.get())
+        except ValueError:
+            messagebox.showerror("Error", f"Invalid budget (must be a positive number of GB): {self.cache_budget_gb.get()}")
+            return
+        ls_source = self.ls_source_dir.get()
+        ls_cache.set_budget(ls_source, budget)
+
+        def enforce():
+            evicted = ls_cache.enforce_budget(ls_source, budget)
+            self.logger.info(f"Evicted from cache: {', '.join(evicted)}" if evicted else "Cache is within budget.")
+            self.after(0, self.refresh_ls_list)
+
+        threading.Thread(target=enforce, daemon=True).start()
 
     def start_build_thread(self):
         threading.Thread(target=self.run_build, daemon=True).start()
 
-    def run_subprocess(self, cmd, success_msg):
+    def run_subprocess(self, cmd, success_msg, on_success=None):
         self.logger.info(f"Running: {' '.join(cmd)}")
         try:
             proc = subprocess.Popen(
@@ -220,6 +291,8 @@ class SerenaBuilderGUI(tk.Tk):
             proc.wait()
             if proc.returncode == 0:
                 self.logger.info(success_msg)
+                if on_success:
+                    on_success()
                 self.after(0, self.refresh_ls_list) # Refresh UI to show new cached items
             else:
                 self.logger.error(f"Process failed with code {proc.returncode}")
@@ -253,7 +326,7 @@ class SerenaBuilderGUI(tk.Tk):
             # 2. Find and Copy Python
             python_src = self.find_uv_python_path(project_root)
             self.logger.info(f"Copying Python from {python_src}...")
-            shutil.copytree(python_src, python_dest_dir)
+            self.io_gov.copytree(python_src, python_dest_dir, label="copy Python")
             
             # 3. Node.js
             node_src = self.get_node_path()
@@ -280,7 +353,7 @@ class SerenaBuilderGUI(tk.Tk):
                 if item.is_dir() and not item.name.startswith(".") and not item.name.startswith("__"):
                     dest = lib_dir / item.name
                     if dest.exists(): shutil.rmtree(dest)
-                    shutil.copytree(item, dest)
+                    self.io_gov.copytree(item, dest, label=f"copy {item.name} source")
 
             # Inject Launcher (if available in current workspace resources)
             # We are running this script from the workspace root probably
@@ -291,6 +364,10 @@ class SerenaBuilderGUI(tk.Tk):
             else:
                 self.logger.warning(f"Launcher not found at {launcher_src}")
 
+            if self.warm_launcher.get():
+                self.logger.info("Injecting warm launcher...")
+                shutil.copy2(Path(__file__).parent / "serena_warm.py", lib_dir / "serena_warm.py")
+
             # Create __main__.py
             (lib_dir / "serena" / "__main__.py").write_text(
                 "from serena.cli import top_level\nif __name__ == '__main__':\n    top_level()\n",
@@ -307,18 +384,31 @@ class SerenaBuilderGUI(tk.Tk):
             self.logger.info(f"Copying {len(selected)} selected language servers...")
             
             if ls_source.exists():
+                packed = []
                 for lang in selected:
                     src = ls_source / lang
                     if src.exists() and src.is_dir():
                         self.logger.info(f"  - {lang}")
-                        shutil.copytree(src, ls_dest / lang)
+                        self.io_gov.copytree(src, ls_dest / lang, label=f"copy {lang}")
+                        packed.append(lang)
                     else:
                         self.logger.warning(f"  - {lang} NOT FOUND in cache (skipped)")
+                ls_cache.record_usage(ls_source, packed, ls_cache.EVENT_PACK)
+                # Packing may cover the whole cache: only pinned languages are protected
+                evicted = ls_cache.enforce_budget(ls_source)
+                if evicted:
+                    self.logger.info(f"Evicted from LS cache: {', '.join(evicted)}")
+                self.after(0, self.refresh_ls_list)
             else:
                 self.logger.error(f"LS Source dir not found: {ls_source}")
 
-            # 7. Launchers
-            self.create_launchers(dist_dir)
+            # 7. Optional pre-warm of the staged servers
+            if self.prewarm_ls.get():
+                self.logger.info("Pre-warming language servers...")
+                prewarm.prewarm_language_servers(dist_dir, [p.name for p in ls_dest.iterdir() if p.is_dir()], self.io_gov)
+
+            # 8. Launchers
+            self.create_launchers(dist_dir, warm=self.warm_launcher.get())
             
             self.logger.info("BUILD COMPLETE SUCCESSFULY!")
             messagebox.showinfo("Success", "Build Complete!")
@@ -356,8 +446,21 @@ class SerenaBuilderGUI(tk.Tk):
             pass
         return None
 
-    def create_launchers(self, dist_path):
+    def create_launchers(self, dist_path, warm=False):
         # Copy-paste of launcher creation logic
+        run_serena = r""""%PYTHON_HOME%\python.exe" -m serena %*
+"""
+        if warm:
+            run_serena = r"""REM Warm launcher: the client hands the call to the resident process, or runs it cold
+REM itself when it cannot be served warm (SERENA_NO_WARM=1 disables)
+if defined SERENA_NO_WARM goto serena_cold
+"%PYTHON_HOME%\python.exe" -I -S "%LIB_DIR%\serena_warm.py" client %*
+goto serena_done
+:serena_cold
+"%PYTHON_HOME%\python.exe" -m serena %*
+:serena_done
+"""
+
         bat_content = r"""@echo off
 setlocal enabledelayedexpansion
 
@@ -377,8 +480,7 @@ set "PYTHONWIN=%LIB_DIR%\Pythonwin"
 set "PATH=%PYTHON_HOME%;%PYTHON_HOME%\Scripts;%NODE_HOME%;%PYWIN32_SYS32%;%PATH%"
 set "PYTHONPATH=%LIB_DIR%;%WIN32_LIB%;%WIN32_LIB_LIB%;%PYTHONWIN%;%PYTHONPATH%"
 
-"%PYTHON_HOME%\python.exe" -m serena %* 
-
+""" + run_serena + r"""
 if %ERRORLEVEL% NEQ 0 (
     echo Serena exited with error code %ERRORLEVEL%
     pause
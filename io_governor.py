@@ -0,0 +1,242 @@
+"""
+Adaptive I/O concurrency governor shared by the file-heavy build stages (copy, extract).
+
+No single worker count suits NVMe workstations, spinning disks and network shares alike,
+so the governor measures throughput and per-file latency while a stage runs and adjusts
+the number of concurrent file operations on its own: it doubles the worker count until
+throughput stops improving, then hill-climbs one worker at a time, backing off when the
+latency rises without a throughput gain. The learnt worker count carries over to the
+next stage, and every stage reports the settings it used in the build log.
+
+Copies and extractions stream through a buffer of BUFFER_BYTES, so each running
+operation holds at most min(file size, BUFFER_BYTES) of file data in memory. The memory
+cap bounds the sum of those buffers; with the defaults it does not bind before the
+worker limit does, but a low cap throttles concurrency on memory-starved hosts.
+
+Configuration (constructor arguments, or environment variables):
+    SERENA_IO_MAX_WORKERS   upper bound for concurrent file operations
+    SERENA_IO_MEMORY_CAP_MB cap for file data buffered by in-flight operations
+"""
+
+import io
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger("SerenaBuilder.IO")
+
+DEFAULT_MEMORY_CAP_MB = 256
+INITIAL_WORKERS = 4
+SAMPLE_SECONDS = 0.5  # minimum length of a measurement window
+SAMPLE_MIN_FILES = 8  # minimum completed files per measurement window
+FILE_OVERHEAD_BYTES = 64 * 1024  # per-file cost, so many small files count as work too
+SIGNIFICANT_CHANGE = 0.05  # relative throughput change treated as real, not noise
+LATENCY_BACKOFF = 1.5  # latency growth that triggers a back-off on a throughput plateau
+# Streaming buffer of shutil.copy2 / ZipFile.extract (both go through shutil's copy loop)
+BUFFER_BYTES = max(getattr(shutil, "COPY_BUFSIZE", 0), 1024 ** 2)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid {name}={value!r}, ignoring")
+        return default
+
+
+class IOGovernor:
+    """Runs file operations with a concurrency level adapted to the measured disk performance."""
+
+    def __init__(self, max_workers=None, memory_cap_mb=None, min_workers=1):
+        default_max = min(32, (os.cpu_count() or 4) * 4)
+        self.max_workers = max(min_workers, max_workers or _env_int("SERENA_IO_MAX_WORKERS", default_max))
+        self.min_workers = min_workers
+        self.memory_cap = (memory_cap_mb or _env_int("SERENA_IO_MEMORY_CAP_MB", DEFAULT_MEMORY_CAP_MB)) * 1024 ** 2
+        self.workers = min(INITIAL_WORKERS, self.max_workers)
+
+    # ==========================================================================
+    # Stages
+    # ==========================================================================
+    def copytree(self, src, dst, ignore=None, label=None):
+        """Concurrent equivalent of shutil.copytree(src, dst, ignore=ignore)."""
+        src, dst = Path(src), Path(dst)
+        if not src.is_dir():
+            # Same errors as shutil.copytree for a missing or non-directory source
+            os.scandir(src).close()
+            raise NotADirectoryError(f"Not a directory: '{src}'")
+        copied_dirs = []
+
+        def walk_error(error):
+            raise error
+
+        def jobs():
+            for dirpath, dirnames, filenames in os.walk(src, onerror=walk_error, followlinks=True):
+                rel = Path(dirpath).relative_to(src)
+                if ignore is not None:
+                    ignored = ignore(dirpath, dirnames + filenames)
+                    dirnames[:] = [d for d in dirnames if d not in ignored]
+                    filenames = [f for f in filenames if f not in ignored]
+                target_dir = dst / rel
+                os.makedirs(target_dir, exist_ok=rel != Path("."))
+                copied_dirs.append((Path(dirpath), target_dir))
+                for name in filenames:
+                    source = Path(dirpath) / name
+                    try:
+                        size = source.stat().st_size
+                    except OSError:
+                        size = 0
+                    yield size, (lambda s=source, d=target_dir / name: shutil.copy2(s, d))
+
+        self.run(jobs(), label or f"copy {src.name}")
+        for source_dir, target_dir in reversed(copied_dirs):
+            shutil.copystat(source_dir, target_dir)
+        return dst
+
+    def extract_zip(self, source, dest, label=None):
+        """Concurrently extract a zip archive given as a path or as bytes into dest."""
+        dest = Path(dest)
+        local = threading.local()
+        opened = []
+        lock = threading.Lock()
+
+        def open_zip():
+            return zipfile.ZipFile(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+        def extract(member):
+            # ZipFile objects are not safe to share between threads: one per worker
+            zf = getattr(local, "zf", None)
+            if zf is None:
+                zf = local.zf = open_zip()
+                with lock:
+                    opened.append(zf)
+            zf.extract(member, dest)
+
+        with open_zip() as index:
+            members = index.infolist()
+        dest.mkdir(parents=True, exist_ok=True)
+        root = dest.resolve()
+
+        def jobs():
+            for member in members:
+                # Create directories up front: concurrent extract() calls race on makedirs
+                target = (root / member.filename).resolve()
+                target_dir = target if member.is_dir() else target.parent
+                if target_dir == root or root in target_dir.parents:
+                    target_dir.mkdir(parents=True, exist_ok=True)
+                if not member.is_dir():
+                    yield member.file_size, (lambda m=member: extract(m))
+
+        try:
+            self.run(jobs(), label or f"extract to {dest.name}")
+        finally:
+            for zf in opened:
+                zf.close()
+        return dest
+
+    # ==========================================================================
+    # Scheduling
+    # ==========================================================================
+    def run(self, jobs, label):
+        """
+        Run (size, callable) jobs concurrently under the adaptive worker limit and memory cap.
+
+        Each job is charged min(size, BUFFER_BYTES) against the memory cap, the data it
+        buffers while streaming.
+
+        The first exception raised by a job stops dispatching and is re-raised once the
+        running jobs have finished.
+        """
+        cond = threading.Condition()
+        state = {"active": 0, "in_flight": 0, "error": None}
+        window = {"start": time.perf_counter(), "bytes": 0, "files": 0, "latency": 0.0}
+        totals = {"bytes": 0, "files": 0}
+        tuning = {"rate": None, "latency": None, "direction": 1, "slow_start": True}
+        worker_range = [self.workers, self.workers]
+
+        def adjust():
+            # Called with cond held, from the dispatching thread
+            now = time.perf_counter()
+            elapsed = now - window["start"]
+            if elapsed < SAMPLE_SECONDS or window["files"] < SAMPLE_MIN_FILES:
+                return
+            rate = (window["bytes"] + window["files"] * FILE_OVERHEAD_BYTES) / elapsed
+            latency = window["latency"] / window["files"]
+            last_rate, last_latency = tuning["rate"], tuning["latency"]
+            if last_rate is not None:
+                if rate < last_rate * (1 - SIGNIFICANT_CHANGE):
+                    tuning["direction"] = -tuning["direction"]
+                    tuning["slow_start"] = False
+                elif rate <= last_rate * (1 + SIGNIFICANT_CHANGE):
+                    # Plateau: more workers only add queueing, so back off if latency grew
+                    tuning["slow_start"] = False
+                    tuning["direction"] = -1 if latency > last_latency * LATENCY_BACKOFF else 0
+            step = self.workers if tuning["slow_start"] and tuning["direction"] > 0 else 1
+            new_workers = max(self.min_workers, min(self.max_workers, self.workers + tuning["direction"] * step))
+            if new_workers != self.workers:
+                logger.debug(
+                    f"I/O governor [{label}]: {rate / 1024 ** 2:.1f} MB/s, {latency * 1000:.1f} ms/file, "
+                    f"workers {self.workers} -> {new_workers}"
+                )
+                self.workers = new_workers
+                worker_range[0] = min(worker_range[0], new_workers)
+                worker_range[1] = max(worker_range[1], new_workers)
+            elif tuning["direction"] == 0:
+                tuning["direction"] = 1  # probe upwards again after holding for a window
+            tuning["rate"], tuning["latency"] = rate, latency
+            window.update(start=now, bytes=0, files=0, latency=0.0)
+
+        def execute(size, charge, fn):
+            started = time.perf_counter()
+            try:
+                fn()
+                error = None
+            except BaseException as e:
+                error = e
+            finished = time.perf_counter()
+            with cond:
+                state["active"] -= 1
+                state["in_flight"] -= charge
+                if error is not None and state["error"] is None:
+                    state["error"] = error
+                window["bytes"] += size
+                window["files"] += 1
+                window["latency"] += finished - started
+                totals["bytes"] += size
+                totals["files"] += 1
+                cond.notify_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="io-governor") as pool:
+            for size, fn in jobs:
+                charge = min(size, BUFFER_BYTES, self.memory_cap)
+                with cond:
+                    while state["error"] is None and (
+                        state["active"] >= self.workers
+                        or (state["in_flight"] and state["in_flight"] + charge > self.memory_cap)
+                    ):
+                        cond.wait(SAMPLE_SECONDS)
+                        adjust()
+                    if state["error"] is not None:
+                        break
+                    adjust()
+                    state["active"] += 1
+                    state["in_flight"] += charge
+                pool.submit(execute, size, charge, fn)
+
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        logger.info(
+            f"I/O governor [{label}]: {totals['files']} files, {totals['bytes'] / 1024 ** 2:.1f} MB "
+            f"in {elapsed:.1f}s ({totals['bytes'] / 1024 ** 2 / elapsed:.1f} MB/s); "
+            f"workers {self.workers} (explored {worker_range[0]}-{worker_range[1]}, max {self.max_workers}), "
+            f"buffer memory cap {self.memory_cap // 1024 ** 2} MB ({BUFFER_BYTES // 1024} KB per operation)"
+        )
+        if state["error"] is not None:
+            raise state["error"]
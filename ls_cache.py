@@ -0,0 +1,274 @@
+"""
+Size-budgeted management of the local language server cache (~/.solidlsp/language_servers).
+
+Usage metadata is kept in a small JSON file inside the cache directory. It records, per
+language, when the entry was last downloaded or packed into a build and how large it is,
+so that the cache can be trimmed back to a size budget by evicting the least recently
+used languages. Pinned languages are never evicted.
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import stat
+import time
+from pathlib import Path
+
+logger = logging.getLogger("SerenaBuilder.LsCache")
+
+USAGE_FILE_NAME = ".serena_builder_cache.json"
+DEFAULT_BUDGET_BYTES = 20 * 1024 ** 3  # 20 GB
+BUDGET_ENV_VAR = "SERENA_LS_CACHE_BUDGET_GB"
+
+# Recorded sizes are trusted below this fraction of the budget; above it, enforcing the
+# budget re-measures every entry (changes deep in a server tree do not touch mtimes)
+REMEASURE_THRESHOLD = 0.9
+
+EVENT_DOWNLOAD = "download"
+EVENT_PACK = "pack"
+
+
+def _remove_readonly(func, path, _):
+    """Clear the readonly bit and reattempt the removal"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def dir_size(path):
+    """Return the total size in bytes of all files below path."""
+    total = 0
+    stack = [str(path)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return total
+
+
+def format_size(num_bytes):
+    """Format a byte count for display, e.g. '1.5 GB'."""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _usage_path(cache_dir):
+    return Path(cache_dir) / USAGE_FILE_NAME
+
+
+def load_usage(cache_dir):
+    """Load the usage metadata of a cache directory (empty defaults if missing or unreadable)."""
+    usage = {"budget_bytes": None, "pinned": [], "entries": {}}
+    path = _usage_path(cache_dir)
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            usage.update({k: data[k] for k in usage if k in data})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache metadata {path}: {e}")
+    return usage
+
+
+def save_usage(cache_dir, usage):
+    """Atomically write the usage metadata of a cache directory."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = _usage_path(cache_dir)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(usage, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def parse_budget_gb(text):
+    """Parse a budget given in GB into bytes; raises ValueError unless it is finite and positive."""
+    value = float(text)
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f"budget must be a positive number of GB, got {text!r}")
+    return int(value * 1024 ** 3)
+
+
+def get_budget(cache_dir):
+    """Return the configured budget in bytes: environment override, then metadata, then default."""
+    env_value = os.environ.get(BUDGET_ENV_VAR)
+    if env_value:
+        try:
+            return parse_budget_gb(env_value)
+        except ValueError:
+            logger.warning(f"Invalid {BUDGET_ENV_VAR}={env_value!r}, ignoring")
+    budget = load_usage(cache_dir).get("budget_bytes")
+    if budget is not None and budget <= 0:
+        logger.warning(f"Ignoring non-positive cache budget {budget} in metadata")
+        budget = None
+    return budget if budget is not None else DEFAULT_BUDGET_BYTES
+
+
+def set_budget(cache_dir, budget_bytes):
+    if budget_bytes <= 0:
+        raise ValueError(f"budget must be positive, got {budget_bytes}")
+    usage = load_usage(cache_dir)
+    usage["budget_bytes"] = int(budget_bytes)
+    save_usage(cache_dir, usage)
+
+
+def set_pinned(cache_dir, languages, pinned=True):
+    """Pin (or unpin) languages so they are never evicted."""
+    usage = load_usage(cache_dir)
+    current = set(usage["pinned"])
+    if pinned:
+        current |= set(languages)
+    else:
+        current -= set(languages)
+    usage["pinned"] = sorted(current)
+    save_usage(cache_dir, usage)
+
+
+def _tree_mtime(path):
+    """Cheap change marker: latest mtime of a directory and its direct children."""
+    latest = path.stat().st_mtime
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    latest = max(latest, entry.stat(follow_symlinks=False).st_mtime)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    return latest
+
+
+def record_usage(cache_dir, languages, event):
+    """Mark languages as used now (downloaded or packed) and refresh their recorded size."""
+    cache_dir = Path(cache_dir)
+    usage = load_usage(cache_dir)
+    now = time.time()
+    for lang in languages:
+        lang_dir = cache_dir / lang
+        if not lang_dir.is_dir():
+            continue
+        entry = usage["entries"].setdefault(lang, {})
+        entry["last_used"] = now
+        entry["last_event"] = event
+        entry["size"] = dir_size(lang_dir)
+        entry["mtime"] = _tree_mtime(lang_dir)
+    save_usage(cache_dir, usage)
+
+
+def cache_entries(cache_dir, refresh=False):
+    """
+    Return a list of dicts (name, size, last_used, pinned) for every language in the cache.
+
+    Sizes recorded in the metadata are reused so that listing the cache does not walk every
+    server tree. An entry is measured again when it was never recorded, when the mtime of
+    its directory or direct children changed, or always with refresh=True (changes deep in
+    a tree do not touch those mtimes).
+    """
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return []
+    usage = load_usage(cache_dir)
+    pinned = set(usage["pinned"])
+    entries = []
+    dirty = False
+    for item in cache_dir.iterdir():
+        if not item.is_dir():
+            continue
+        info = usage["entries"].setdefault(item.name, {})
+        mtime = _tree_mtime(item)
+        if refresh or "size" not in info or info.get("mtime") != mtime:
+            size = dir_size(item)
+            if info.get("size") != size or info.get("mtime") != mtime:
+                info["size"] = size
+                info["mtime"] = mtime
+                dirty = True
+            if "last_used" not in info:
+                info["last_used"] = item.stat().st_mtime
+                dirty = True
+        entries.append({
+            "name": item.name,
+            "size": info["size"],
+            "last_used": info.get("last_used", 0),
+            "pinned": item.name in pinned,
+        })
+    # Forget metadata of entries removed outside the builder
+    stale = set(usage["entries"]) - {e["name"] for e in entries}
+    for name in stale:
+        del usage["entries"][name]
+    if dirty or stale:
+        save_usage(cache_dir, usage)
+    return entries
+
+
+def cache_occupancy(cache_dir):
+    """Return (used_bytes, budget_bytes) for a cache directory."""
+    used = sum(e["size"] for e in cache_entries(cache_dir))
+    return used, get_budget(cache_dir)
+
+
+def enforce_budget(cache_dir, budget_bytes=None, keep=()):
+    """
+    Evict least recently used, unpinned languages until the cache fits the budget.
+
+    Languages in `keep` (e.g. the ones just downloaded) are treated like pinned ones for
+    this run. Recorded sizes are trusted while the cache is clearly below the budget; only
+    near or over it is every entry measured again. Returns the list of evicted language names.
+    """
+    cache_dir = Path(cache_dir)
+    if budget_bytes is None:
+        budget_bytes = get_budget(cache_dir)
+    entries = cache_entries(cache_dir)
+    used = sum(e["size"] for e in entries)
+    if used < budget_bytes * REMEASURE_THRESHOLD:
+        return []
+    # Near or over budget: measure again, servers may have grown since they were recorded
+    entries = cache_entries(cache_dir, refresh=True)
+    used = sum(e["size"] for e in entries)
+    if used <= budget_bytes:
+        return []
+
+    protected = set(keep)
+    candidates = sorted(
+        (e for e in entries if not e["pinned"] and e["name"] not in protected),
+        key=lambda e: e["last_used"],
+    )
+    evicted = []
+    for entry in candidates:
+        if used <= budget_bytes:
+            break
+        logger.info(f"Evicting {entry['name']} ({format_size(entry['size'])}) from LS cache")
+        try:
+            shutil.rmtree(cache_dir / entry["name"], onerror=_remove_readonly)
+        except OSError as e:
+            logger.warning(f"Failed to evict {entry['name']}: {e}")
+            continue
+        used -= entry["size"]
+        evicted.append(entry["name"])
+
+    if evicted:
+        usage = load_usage(cache_dir)
+        for name in evicted:
+            usage["entries"].pop(name, None)
+        save_usage(cache_dir, usage)
+    if used > budget_bytes:
+        logger.warning(
+            f"LS cache still uses {format_size(used)} (budget {format_size(budget_bytes)}); "
+            "remaining entries are pinned or in use"
+        )
+    return evicted
@@ -0,0 +1,329 @@
+"""
+Optional build stage that pre-warms the bundled language servers.
+
+Each selected language server is started, using the bundled interpreter and a tiny
+fixture project, from a scratch copy of the staged `data/solidlsp` that holds only that
+server's `language_servers/<language>` directory next to the rest of solidlsp. Whatever
+the server adds or changes below that copy on its first start (unpacked bundles, stdlib/JDK indexes,
+caches) is its warm state. The state is only shipped if
+
+  * no file of it embeds an absolute path of the build machine (every file is scanned), and
+  * a start from a fresh copy carrying the state, at yet another location, is faster than a
+    start from a fresh copy without it. The first start has already primed the OS page
+    cache and the imports, and bytecode writing is disabled, so the comparison isolates
+    the effect of the state.
+
+Otherwise the whole state of that language is dropped; the staged bundle itself is only
+touched when a language's state is accepted.
+
+Every start gets a fresh fixture project and a fresh user profile (HOME, APPDATA,
+TEMP, ...), so nothing leaks into the build host's profile and nothing outside the
+solidlsp directory can make a later start faster. State written there is not shipped, as
+the generated launchers do not redirect the profile.
+"""
+
+import json
+import logging
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger("SerenaBuilder.Prewarm")
+
+RUN_TIMEOUT_SECONDS = 600
+MIN_SPEEDUP = 1.1  # warm start must be at least this much faster than the cold start
+SCAN_CHUNK_BYTES = 1024 ** 2
+RESULT_MARKER = "PREWARM_RESULT "
+
+# Minimal project per language: {relative path: content}; the first file is queried.
+FIXTURES = {
+    "java": {"src/main/java/Main.java": "public class Main {\n    public static void main(String[] args) {}\n}\n"},
+    "kotlin": {"src/main/kotlin/Main.kt": "fun main() {\n    println(\"hello\")\n}\n"},
+    "typescript": {
+        "index.ts": "export function main(): string {\n    return \"hello\";\n}\n",
+        "tsconfig.json": "{\"compilerOptions\": {\"strict\": true}}\n",
+    },
+    "csharp": {
+        "Program.cs": "class Program {\n    static void Main() {}\n}\n",
+        "Fixture.csproj": "<Project Sdk=\"Microsoft.NET.Sdk\">\n  <PropertyGroup>\n"
+                          "    <OutputType>Exe</OutputType>\n  </PropertyGroup>\n</Project>\n",
+    },
+    "cpp": {"main.cpp": "int main() {\n    return 0;\n}\n"},
+    "clojure": {"src/main.clj": "(ns main)\n\n(defn hello [] \"hello\")\n", "deps.edn": "{}\n"},
+    "bash": {"main.sh": "#!/bin/bash\nhello() {\n    echo hello\n}\n"},
+    "lua": {"main.lua": "local function hello()\n    return \"hello\"\nend\n"},
+    "markdown": {"README.md": "# Fixture\n\n## Section\n"},
+    "terraform": {"main.tf": "variable \"name\" {\n  default = \"hello\"\n}\n"},
+    "dart": {"lib/main.dart": "void main() {}\n", "pubspec.yaml": "name: fixture\n"},
+    "julia": {"main.jl": "function hello()\n    \"hello\"\nend\n"},
+    "scala": {"src/main/scala/Main.scala": "object Main {\n  def main(args: Array[String]): Unit = ()\n}\n"},
+    "swift": {"main.swift": "func hello() -> String {\n    return \"hello\"\n}\n"},
+    "elm": {
+        "src/Main.elm": "module Main exposing (hello)\n\n\nhello : String\nhello =\n    \"hello\"\n",
+        "elm.json": "{\"type\": \"application\", \"source-directories\": [\"src\"], \"elm-version\": \"0.19.1\", "
+                    "\"dependencies\": {\"direct\": {}, \"indirect\": {}}, "
+                    "\"test-dependencies\": {\"direct\": {}, \"indirect\": {}}}\n",
+    },
+    "zig": {"main.zig": "pub fn main() void {}\n"},
+    "yaml": {"config.yaml": "name: fixture\nitems:\n  - one\n"},
+    "php": {"index.php": "<?php\nfunction hello() {\n    return 'hello';\n}\n"},
+    "perl": {"main.pl": "sub hello {\n    return 'hello';\n}\n1;\n"},
+    "ruby": {"main.rb": "def hello\n  'hello'\nend\n"},
+}
+
+# Executed by the bundled interpreter; starts one server and reports the time to first answer.
+RUNNER_SCRIPT = r'''
+import json
+import os
+import sys
+import time
+
+start = time.perf_counter()
+from solidlsp.ls import SolidLanguageServer
+from solidlsp.ls_config import Language, LanguageServerConfig
+from solidlsp.settings import SolidLSPSettings
+
+language, project_root, query_file = sys.argv[1:4]
+settings = SolidLSPSettings(solidlsp_dir=os.environ["SOLIDLSP_DIR"])
+ls = SolidLanguageServer.create(
+    LanguageServerConfig(code_language=Language(language)), project_root, solidlsp_settings=settings
+)
+ls.start()
+try:
+    ls.request_document_symbols(query_file)
+    elapsed = time.perf_counter() - start
+finally:
+    ls.stop()
+print("PREWARM_RESULT " + json.dumps({"elapsed": elapsed}))
+'''
+
+
+def _remove_readonly(func, path, _):
+    """Clear the readonly bit and reattempt the removal"""
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+
+def _snapshot(root):
+    """Return {relative path: (size, mtime)} for all files below root."""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = Path(dirpath) / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files[path.relative_to(root)] = (st.st_size, st.st_mtime)
+    return files
+
+
+def _write_fixture(project_dir, language):
+    files = FIXTURES[language]
+    for rel_path, content in files.items():
+        path = project_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    return next(iter(files))
+
+
+def _bundle_env(dist_dir, solidlsp_dir, scratch_dir):
+    """Environment of the generated launchers, with the user profile redirected to scratch_dir."""
+    lib_dir = dist_dir / "lib"
+    python_home = dist_dir / "python"
+    env = os.environ.copy()
+    env["SOLIDLSP_DIR"] = str(solidlsp_dir)
+    # Keep the bundle free of build-host bytecode, and keep bytecode out of the timings
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env["PATH"] = os.pathsep.join([
+        str(python_home), str(python_home / "Scripts"), str(dist_dir / "bin"),
+        str(lib_dir / "pywin32_system32"), env.get("PATH", ""),
+    ])
+    env["PYTHONPATH"] = os.pathsep.join([
+        str(lib_dir), str(lib_dir / "win32"), str(lib_dir / "win32" / "lib"), str(lib_dir / "Pythonwin"),
+    ])
+    for var in ("HOME", "USERPROFILE", "APPDATA", "LOCALAPPDATA", "TEMP", "TMP", "XDG_CACHE_HOME"):
+        path = scratch_dir / var.lower()
+        path.mkdir(exist_ok=True)
+        env[var] = str(path)
+    return env
+
+
+def _run_server(python_exe, runner, language, dist_dir, solidlsp_dir, run_dir):
+    """
+    Start the server once via the bundled interpreter, with a fresh fixture project and user
+    profile below run_dir; return the elapsed seconds or None.
+    """
+    project_dir = run_dir / "project"
+    project_dir.mkdir(parents=True)
+    query_file = _write_fixture(project_dir, language)
+    env = _bundle_env(dist_dir, solidlsp_dir, run_dir)
+    try:
+        result = subprocess.run(
+            [str(python_exe), str(runner), language, str(project_dir), query_file],
+            env=env, capture_output=True, text=True, timeout=RUN_TIMEOUT_SECONDS,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+    except subprocess.TimeoutExpired:
+        logger.warning(f"  {language}: server did not answer within {RUN_TIMEOUT_SECONDS}s")
+        return None
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])["elapsed"]
+    logger.warning(f"  {language}: warm-up run failed (exit code {result.returncode})")
+    if result.stderr:
+        logger.debug(result.stderr)
+    return None
+
+
+def _is_relocatable(path, needles):
+    """True unless the file embeds one of the build-machine paths in needles (scanned in chunks)."""
+    overlap = max(len(needle) for needle in needles) - 1
+    tail = b""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(SCAN_CHUNK_BYTES)
+                if not chunk:
+                    return True
+                data = tail + chunk.lower()
+                if any(needle in data for needle in needles):
+                    return False
+                tail = data[-overlap:] if overlap else b""
+    except OSError:
+        return False
+
+
+def _path_needles(*paths):
+    needles = set()
+    for path in paths:
+        text = str(path).lower()
+        for variant in (text, text.replace("\\", "/"), text.replace("\\", "\\\\")):
+            needles.add(variant.encode("utf-8"))
+            needles.add(variant.encode("utf-16-le"))
+    return needles
+
+
+def _scratch_tree(io_gov, solidlsp_dir, language, dst):
+    """Copy solidlsp without other servers: everything but language_servers, plus this language."""
+    servers_dir = solidlsp_dir / "language_servers"
+    io_gov.copytree(
+        solidlsp_dir, dst,
+        ignore=lambda dirpath, names: {servers_dir.name} if Path(dirpath) == solidlsp_dir else set(),
+        label=f"pre-warm copy solidlsp ({language})",
+    )
+    if (servers_dir / language).is_dir():
+        io_gov.copytree(servers_dir / language, dst / servers_dir.name / language, label=f"pre-warm copy {language}")
+    return dst
+
+
+def _state_files(root, before):
+    """Files below root that were added or changed since the `before` snapshot."""
+    return [p for p, st in _snapshot(root).items() if before.get(p) != st]
+
+
+def _apply_state(io_gov, work_dir, target_dir, state, label):
+    """Copy the state files captured in work_dir over target_dir."""
+    def copy(source, dest):
+        if dest.exists():
+            os.chmod(dest, stat.S_IWRITE)
+        shutil.copy2(source, dest)
+
+    def jobs():
+        for rel_path in state:
+            source, dest = work_dir / rel_path, target_dir / rel_path
+            # Create directories up front, concurrent copies would race on them
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            yield source.stat().st_size, (lambda s=source, d=dest: copy(s, d))
+
+    io_gov.run(jobs(), label)
+
+
+def _prewarm_language(io_gov, python_exe, runner, language, dist_dir, solidlsp_dir, scratch_dir, needles):
+    """Capture and validate the warm state of one language; return (cold, warm, files) or None."""
+    # 1. First start from a pristine copy: produces the state, primes page cache and imports
+    work_dir = _scratch_tree(io_gov, solidlsp_dir, language, scratch_dir / "capture" / "solidlsp")
+    before = _snapshot(work_dir)
+    if _run_server(python_exe, runner, language, dist_dir, work_dir, scratch_dir / "run-capture") is None:
+        return None
+    state = _state_files(work_dir, before)
+    if not state:
+        logger.info(f"  {language}: server wrote no state below solidlsp, nothing to ship")
+        return None
+
+    # 2. Relocatable? Any file tied to this machine makes the whole state unusable
+    non_relocatable = [p for p in state if not _is_relocatable(work_dir / p, needles)]
+    if non_relocatable:
+        logger.warning(
+            f"  {language}: {len(non_relocatable)} of {len(state)} state files embed build-machine "
+            f"paths (e.g. {non_relocatable[0]}), dropping warm state"
+        )
+        return None
+
+    # 3. Cold start from a fresh copy without the state
+    cold_dir = _scratch_tree(io_gov, solidlsp_dir, language, scratch_dir / "cold" / "solidlsp")
+    cold = _run_server(python_exe, runner, language, dist_dir, cold_dir, scratch_dir / "run-cold")
+    shutil.rmtree(cold_dir.parent, onerror=_remove_readonly)
+
+    # 4. Warm start from a fresh copy carrying the state, at another location
+    warm_dir = _scratch_tree(io_gov, solidlsp_dir, language, scratch_dir / "warm" / "solidlsp")
+    _apply_state(io_gov, work_dir, warm_dir, state, f"pre-warm apply state ({language})")
+    warm = _run_server(python_exe, runner, language, dist_dir, warm_dir, scratch_dir / "run-warm")
+    shutil.rmtree(warm_dir.parent, onerror=_remove_readonly)
+
+    if cold is None or warm is None or warm * MIN_SPEEDUP > cold:
+        logger.warning(
+            f"  {language}: no start-up gain (cold {'n/a' if cold is None else f'{cold:.1f}s'}, warm "
+            f"{'n/a' if warm is None else f'{warm:.1f}s'}), dropping warm state"
+        )
+        return None
+
+    _apply_state(io_gov, work_dir, solidlsp_dir, state, f"ship {language} warm state")
+    return cold, warm, len(state)
+
+
+def prewarm_language_servers(dist_dir, languages, io_gov):
+    """
+    Pre-warm the given languages in the staged bundle at dist_dir.
+
+    Scratch copies and shipped state go through the builder's IOGovernor `io_gov`.
+
+    Returns {language: (cold_seconds, warm_seconds)} for every language whose warm state
+    was shipped.
+    """
+    dist_dir = Path(dist_dir)
+    solidlsp_dir = dist_dir / "data" / "solidlsp"
+    python_exe = dist_dir / "python" / ("python.exe" if os.name == "nt" else "bin/python3")
+    if not python_exe.exists():
+        logger.error(f"Bundled interpreter not found at {python_exe}, skipping pre-warm")
+        return {}
+
+    results = {}
+    scratch_root = Path(tempfile.mkdtemp(prefix="serena-prewarm-"))
+    needles = _path_needles(dist_dir.resolve(), scratch_root.resolve(), scratch_root)
+    try:
+        runner = scratch_root / "prewarm_runner.py"
+        runner.write_text(RUNNER_SCRIPT, encoding="utf-8")
+        for language in languages:
+            if language not in FIXTURES:
+                logger.warning(f"  {language}: no fixture project available, skipping")
+                continue
+            scratch_dir = scratch_root / language
+            try:
+                result = _prewarm_language(
+                    io_gov, python_exe, runner, language, dist_dir, solidlsp_dir, scratch_dir, needles
+                )
+            finally:
+                if scratch_dir.exists():
+                    shutil.rmtree(scratch_dir, onerror=_remove_readonly)
+            if result is None:
+                continue
+            cold, warm, files = result
+            logger.info(f"  {language}: cold {cold:.1f}s -> warm {warm:.1f}s ({files} state files shipped)")
+            results[language] = (cold, warm)
+    finally:
+        shutil.rmtree(scratch_root, onerror=_remove_readonly)
+    return results
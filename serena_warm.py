@@ -0,0 +1,471 @@
+"""
+Resident warm launcher for the standalone Serena CLI.
+
+Shipped into the bundle's `lib/` when the warm-launcher mode is enabled at build time.
+
+    python -I -S serena_warm.py client <args>   # used by serena.bat
+    python serena_warm.py serve                 # the resident process (started by the client)
+
+The resident process imports `serena.cli` once and then serves CLI invocations over a
+localhost socket: the client forwards argv, working directory and environment, and the
+server streams stdout/stderr back and finally the exit code. The client only needs the
+standard library, so it starts in a few tens of milliseconds.
+
+Calls run inside the resident process, so only one is served at a time and only for the
+short-running subcommands in WARM_COMMANDS (override with SERENA_WARM_COMMANDS, a comma
+separated list of command paths such as "tools list,project generate-yml"). Whenever a
+call is not served warm - no resident process yet (one is then started in the background
+for the next call), another call in progress, a command not on the list - the client runs
+`python -m serena` itself, so the caller always sees the command's own exit code.
+
+A starting resident process claims the bundle with a lock file next to its state file
+before importing Serena, and clients do not start another one while that claim is live.
+
+State that Serena keeps in the process is only partly reset between calls: environment,
+working directory, argv, standard streams and the logging configuration are restored
+after each call. Edits to the Serena configuration file, or an updated bundle, make the
+resident process hand the call back to a cold start and retire, so the next call gets a
+fresh one. The resident process exits after being idle for SERENA_WARM_IDLE_TIMEOUT
+seconds.
+
+The client path must stay standard-library only and import as little as possible.
+"""
+
+import io
+import json
+import os
+import socket
+import struct
+import sys
+from pathlib import Path
+
+DEFAULT_IDLE_TIMEOUT = 600
+CONNECT_TIMEOUT = 1.0
+ACCEPT_POLL_SECONDS = 1.0
+CLAIM_TIMEOUT_SECONDS = 120  # a start-up claim older than this is left over from a crash
+
+# Command paths that may run in the resident process (short-lived, no stdin, no editor)
+WARM_COMMANDS = {
+    ("tools", "list"),
+    ("tools", "description"),
+    ("prompts", "list"),
+    ("prompts", "list-overrides"),
+    ("mode", "list"),
+    ("context", "list"),
+    ("project", "generate-yml"),
+}
+
+_FRAME_HEADER = struct.Struct("!BI")  # channel, payload length
+CHANNEL_REQUEST = 0
+CHANNEL_STDOUT = 1
+CHANNEL_STDERR = 2
+CHANNEL_EXIT = 3
+CHANNEL_NOT_SERVED = 4  # payload: reason; the client runs the command cold
+
+NOT_SERVED_BUSY = b"busy"
+NOT_SERVED_STALE = b"stale"
+
+
+def _state_file():
+    """Per-user, per-bundle file holding the port and token of the resident process."""
+    import hashlib
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_RUNTIME_DIR") or os.path.expanduser("~")
+    bundle_id = hashlib.sha1(str(Path(__file__).resolve().parent).lower().encode("utf-8")).hexdigest()[:16]
+    return Path(base) / "serena-warm" / f"{bundle_id}.json"
+
+
+def _claim_file(state_file):
+    """Lock file held by a resident process from before its imports until it is serving."""
+    return state_file.with_suffix(".lock")
+
+
+def _claim_live(claim_file):
+    import time
+    try:
+        return time.time() - claim_file.stat().st_mtime < CLAIM_TIMEOUT_SECONDS
+    except OSError:
+        return False
+
+
+def _send_frame(sock, channel, payload):
+    sock.sendall(_FRAME_HEADER.pack(channel, len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data += chunk
+    return bytes(data)
+
+
+def _recv_frame(sock):
+    channel, size = _FRAME_HEADER.unpack(_recv_exact(sock, _FRAME_HEADER.size))
+    return channel, _recv_exact(sock, size)
+
+
+# ==============================================================================
+# CLIENT
+# ==============================================================================
+def _spawn_server():
+    """Start the resident process in the background, detached from this console."""
+    import subprocess
+    exe = Path(sys.executable)
+    pythonw = exe.with_name("pythonw.exe")
+    if pythonw.exists():
+        exe = pythonw
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    try:
+        subprocess.Popen(
+            [str(exe), str(Path(__file__).resolve()), "serve"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            close_fds=True, **kwargs
+        )
+    except OSError:
+        pass
+
+
+def _connect():
+    """Connect to the resident process; return (socket, token) or None."""
+    state_file = _state_file()
+    try:
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+        sock = socket.create_connection(("127.0.0.1", state["port"]), timeout=CONNECT_TIMEOUT)
+    except (OSError, ValueError, KeyError):
+        return None
+    sock.settimeout(None)
+    return sock, state["token"]
+
+
+def _warm_commands():
+    value = os.environ.get("SERENA_WARM_COMMANDS")
+    if value is None:
+        return WARM_COMMANDS
+    return {tuple(path.split()) for path in value.split(",") if path.strip()}
+
+
+def _is_warm_call(args):
+    if args in (["--help"], ["--version"]):
+        return True
+    return any(tuple(args[:len(path)]) == path for path in _warm_commands())
+
+
+def _run_warm(args):
+    """Run the call in the resident process; return its exit code, or None if not served."""
+    if not _is_warm_call(args):
+        return None
+    connection = _connect()
+    if connection is None:
+        # Not while another resident process is still starting up
+        if not _claim_live(_claim_file(_state_file())):
+            _spawn_server()
+        return None
+
+    sock, token = connection
+    request = {
+        "token": token,
+        "args": args,
+        "cwd": os.getcwd(),
+        "env": dict(os.environ),
+        "encoding": sys.stdout.encoding or "utf-8",
+    }
+    outputs = {CHANNEL_STDOUT: sys.stdout, CHANNEL_STDERR: sys.stderr}
+    output_seen = False
+    with sock:
+        try:
+            _send_frame(sock, CHANNEL_REQUEST, json.dumps(request).encode("utf-8"))
+            channel, payload = _recv_frame(sock)
+            while channel in outputs:
+                output_seen = True
+                stream = outputs[channel]
+                stream.flush()
+                stream.buffer.write(payload)
+                stream.buffer.flush()
+                channel, payload = _recv_frame(sock)
+        except OSError:
+            if not output_seen:
+                # Rejected or died before doing anything visible: safe to run cold instead
+                return None
+            sys.stderr.write("serena: lost connection to the warm launcher\n")
+            return 1
+    if channel == CHANNEL_NOT_SERVED:
+        if payload == NOT_SERVED_STALE:
+            _spawn_server()
+        return None
+    return int(payload)
+
+
+def _run_cold(args):
+    """Normal start of the CLI in a fresh interpreter (environment as set by serena.bat)."""
+    import subprocess
+    try:
+        return subprocess.call([sys.executable, "-m", "serena"] + args)
+    except KeyboardInterrupt:
+        return 130
+
+
+def run_client(args):
+    exit_code = _run_warm(args)
+    return _run_cold(args) if exit_code is None else exit_code
+
+
+# ==============================================================================
+# SERVER
+# ==============================================================================
+class _FrameWriter(io.RawIOBase):
+    """Raw binary stream that forwards everything written to the client on one channel."""
+
+    def __init__(self, sock, channel):
+        super().__init__()
+        self.sock = sock
+        self.channel = channel
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            _send_frame(self.sock, self.channel, data)
+        return len(data)
+
+
+def _text_stream(sock, channel, encoding):
+    return io.TextIOWrapper(
+        io.BufferedWriter(_FrameWriter(sock, channel)), encoding=encoding, errors="replace",
+        line_buffering=True, write_through=True,
+    )
+
+
+def _snapshot_logging():
+    import logging
+    loggers = [logging.getLogger()] + [
+        lg for lg in logging.Logger.manager.loggerDict.values() if isinstance(lg, logging.Logger)
+    ]
+    return [(lg, list(lg.handlers), lg.level, lg.propagate, lg.disabled) for lg in loggers]
+
+
+def _restore_logging(snapshot):
+    """Undo logging configuration done by a call; close handlers it added (they point at its streams)."""
+    import logging
+    known = {id(lg) for lg, *_ in snapshot}
+    kept = {id(h) for _, handlers, *_ in snapshot for h in handlers}
+    loggers = [logging.getLogger()] + [
+        lg for lg in logging.Logger.manager.loggerDict.values() if isinstance(lg, logging.Logger)
+    ]
+    for lg in loggers:
+        for handler in lg.handlers:
+            if id(handler) not in kept:
+                try:
+                    handler.close()
+                except Exception:
+                    pass
+        if id(lg) not in known:
+            lg.handlers = [h for h in lg.handlers if id(h) in kept]
+    for lg, handlers, level, propagate, disabled in snapshot:
+        lg.handlers = handlers
+        lg.level = level
+        lg.propagate = propagate
+        lg.disabled = disabled
+
+
+def _run_invocation(request, sock):
+    """Run one CLI invocation in this process with the client's argv, cwd and environment."""
+    import traceback
+    from serena.cli import top_level
+
+    stdout = _text_stream(sock, CHANNEL_STDOUT, request["encoding"])
+    stderr = _text_stream(sock, CHANNEL_STDERR, request["encoding"])
+    saved = (sys.stdin, sys.stdout, sys.stderr, sys.argv, dict(os.environ), os.getcwd())
+    saved_logging = _snapshot_logging()
+    try:
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.chdir(request["cwd"])
+        sys.argv = ["serena"] + request["args"]
+        sys.stdin, sys.stdout, sys.stderr = io.StringIO(""), stdout, stderr
+        try:
+            top_level.main(args=request["args"], prog_name="serena")
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        stdout.flush()
+        stderr.flush()
+    finally:
+        _restore_logging(saved_logging)
+        sys.stdin, sys.stdout, sys.stderr, sys.argv = saved[:4]
+        os.environ.clear()
+        os.environ.update(saved[4])
+        os.chdir(saved[5])
+    return exit_code
+
+
+def _config_fingerprint(env):
+    """mtimes of what the preloaded process may have cached: the Serena config and the bundle."""
+    home = env.get("USERPROFILE") or env.get("HOME") or ""
+    paths = [
+        Path(home) / ".serena" / "serena_config.yml",
+        Path(__file__).resolve().parent / "serena",
+        Path(__file__).resolve(),
+    ]
+    fingerprint = []
+    for path in paths:
+        try:
+            fingerprint.append(path.stat().st_mtime)
+        except OSError:
+            fingerprint.append(None)
+    return fingerprint
+
+
+class _Server:
+    def __init__(self, token, state_file):
+        import threading
+        self.token = token
+        self.state_file = state_file
+        self.busy = threading.Lock()
+        self.stop = threading.Event()
+        self.fingerprint = None  # set at start-up, after serena.cli was imported
+        self.last_activity = 0.0
+
+    def retire(self):
+        """Stop accepting calls and hand the bundle over to a fresh resident process."""
+        self.stop.set()
+        _remove_state_file(self.state_file)
+
+    def handle(self, conn):
+        import hmac
+        import time
+        with conn:
+            try:
+                channel, payload = _recv_frame(conn)
+                request = json.loads(payload.decode("utf-8"))
+            except (ConnectionError, ValueError):
+                return
+            if channel != CHANNEL_REQUEST or not hmac.compare_digest(str(request.get("token")), self.token):
+                return
+            try:
+                if self.stop.is_set() or not self.busy.acquire(blocking=False):
+                    _send_frame(conn, CHANNEL_NOT_SERVED, NOT_SERVED_BUSY)
+                    return
+                try:
+                    if _config_fingerprint(request["env"]) != self.fingerprint:
+                        self.retire()
+                        _send_frame(conn, CHANNEL_NOT_SERVED, NOT_SERVED_STALE)
+                        return
+                    exit_code = _run_invocation(request, conn)
+                    _send_frame(conn, CHANNEL_EXIT, str(exit_code).encode("ascii"))
+                finally:
+                    self.last_activity = time.monotonic()
+                    self.busy.release()
+            except OSError:
+                pass  # client went away
+
+
+def _remove_state_file(state_file):
+    try:
+        if json.loads(state_file.read_text(encoding="utf-8")).get("pid") == os.getpid():
+            state_file.unlink()
+    except (OSError, ValueError):
+        pass
+
+
+def _claim(claim_file):
+    """Atomically claim the bundle for this process; False if another live process holds it."""
+    claim_file.parent.mkdir(parents=True, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(str(claim_file), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if _claim_live(claim_file):
+                return False
+            # Left over by a process that died while starting: take it over
+            try:
+                claim_file.unlink()
+            except OSError:
+                pass
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid()}, f)
+        return True
+    return False
+
+
+def _release_claim(claim_file):
+    _remove_state_file(claim_file)  # same pid check as for the state file
+
+
+def run_server(idle_timeout=None):
+    import secrets
+    import threading
+    import time
+
+    if idle_timeout is None:
+        idle_timeout = float(os.environ.get("SERENA_WARM_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+    def serving():
+        existing = _connect()
+        if existing is not None:
+            existing[0].close()
+        return existing is not None
+
+    if serving():
+        return 0  # another resident process is already serving this bundle
+    state_file = _state_file()
+    claim_file = _claim_file(state_file)
+    if not _claim(claim_file):
+        return 0  # another resident process is starting up
+    try:
+        import serena.cli  # noqa: F401  (the whole point: keep the CLI stack imported)
+
+        if serving():
+            return 0  # published by a process whose claim was released before ours was taken
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(16)
+        listener.settimeout(ACCEPT_POLL_SECONDS)
+        token = secrets.token_hex(16)
+        tmp_file = state_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps({"port": listener.getsockname()[1], "token": token, "pid": os.getpid()}),
+                            encoding="utf-8")
+        os.replace(tmp_file, state_file)
+    finally:
+        _release_claim(claim_file)
+
+    server = _Server(token, state_file)
+    server.fingerprint = _config_fingerprint(os.environ)
+    server.last_activity = time.monotonic()
+    try:
+        while not server.stop.is_set():
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                if not server.busy.locked() and time.monotonic() - server.last_activity > idle_timeout:
+                    break
+                continue
+            conn.settimeout(None)
+            # Each connection gets a thread, so callers arriving during a call are turned away
+            # (and run cold) at once instead of queueing behind it
+            threading.Thread(target=server.handle, args=(conn,)).start()
+    finally:
+        listener.close()
+        _remove_state_file(state_file)
+    return 0
+
+
+if __name__ == "__main__":
+    mode, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("client", [])
+    if mode == "serve":
+        sys.exit(run_server())
+    sys.exit(run_client(args))